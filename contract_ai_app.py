@@ -2,39 +2,107 @@
 
 import os
 import re
-import uuid
-import shutil
+import json
+import logging
+import asyncio
+import hashlib
+import secrets
+import time
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from bisect import bisect_right
+from collections import OrderedDict
+from contextlib import asynccontextmanager
 from datetime import datetime
+from email.utils import parsedate_to_datetime
+from functools import lru_cache
+from pathlib import Path
+from xml.sax.saxutils import escape
 
-from fastapi import FastAPI, UploadFile, File
-from fastapi.responses import FileResponse
+from fastapi import FastAPI, UploadFile, File, BackgroundTasks, HTTPException, Request
+from fastapi.responses import FileResponse, Response
+
+import aiofiles
 
-import pdfplumber
-import docx
 import spacy
-from langdetect import detect
+import fasttext
+
+try:
+    import ahocorasick
+except ImportError:
+    ahocorasick = None
 
 from reportlab.lib.pagesizes import A4
-from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer
+from reportlab.platypus import (
+    SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle, ListFlowable
+)
 from reportlab.lib.styles import getSampleStyleSheet
 
+from docx_text import extract_docx_text
+from pdf_worker import extract_pdf_pages, extract_short_pdf, page_chunks
+
 
 # ===============================
 # INITIAL SETUP
 # ===============================
 
-UPLOAD_DIR = "uploads"
-REPORT_DIR = "reports"
+logger = logging.getLogger(__name__)
+
+UPLOAD_DIR = Path("uploads")
+REPORT_DIR = Path("reports")
+CACHE_DIR = Path("cache")
+
+ALLOWED_EXTENSIONS = {"pdf", "docx", "txt"}
+
+PDF_WORKERS = int(os.getenv("PDF_WORKERS", str(min(os.cpu_count() or 1, 8))))
+PDF_FANOUT_MIN_PAGES = int(os.getenv("PDF_FANOUT_MIN_PAGES", "8"))
+PDF_TIMEOUT = float(os.getenv("PDF_TIMEOUT", "120"))
+PARSE_CONCURRENCY = int(os.getenv("PARSE_CONCURRENCY", "4"))
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+
+# bump whenever analysis output changes so stale cached results miss
+ANALYSIS_VERSION = "2"
+CACHE_MAX_ENTRIES = int(os.getenv("CACHE_MAX_ENTRIES", "500"))
+
+if PDF_WORKERS < 1:
+    raise ValueError(f"PDF_WORKERS must be at least 1, got {PDF_WORKERS}")
+
+UPLOAD_DIR.mkdir(exist_ok=True)
+REPORT_DIR.mkdir(exist_ok=True)
+CACHE_DIR.mkdir(exist_ok=True)
+
+LID_MODEL_PATH = os.getenv("LID_MODEL_PATH", "lid.176.bin")
+SPACY_BATCH_SIZE = int(os.getenv("SPACY_BATCH_SIZE", "32"))
+ENTITY_LIMIT = 200
+NER_CACHE_SIZE = 10_000
+
+# only NER is consumed downstream; in en_core_web_sm ner has its own
+# internal tok2vec, the shared one only feeds tagger and parser
+nlp = spacy.load(
+    "en_core_web_sm",
+    exclude=["tok2vec", "parser", "tagger", "lemmatizer", "attribute_ruler"]
+)
+
+
+@asynccontextmanager
+async def lifespan(app):
+    # warm up once so the first request doesn't pay for lazy init, and so
+    # concurrent first requests don't each load the language model
+    nlp("warmup")
+    language_model()
+    yield
 
-os.makedirs(UPLOAD_DIR, exist_ok=True)
-os.makedirs(REPORT_DIR, exist_ok=True)
+    if pdf_pool is not None:
+        pdf_pool.shutdown()
 
-nlp = spacy.load("en_core_web_sm")
 
 app = FastAPI(
     title="Contract Analysis AI",
     description="AI Powered Contract Risk Analyzer",
-    version="1.0"
+    version="1.0",
+    lifespan=lifespan
 )
 
 
@@ -42,37 +110,191 @@ app = FastAPI(
 # FILE HANDLING
 # ===============================
 
-def save_file(file: UploadFile):
-    ext = file.filename.split(".")[-1]
-    file_id = str(uuid.uuid4())
-    path = f"{UPLOAD_DIR}/{file_id}.{ext}"
+def file_extension(file: UploadFile):
+    return Path(file.filename or "").suffix.lower().lstrip(".")
 
-    with open(path, "wb") as buffer:
-        shutil.copyfileobj(file.file, buffer)
 
-    return path
+async def save_file(file: UploadFile, ext):
+    tmp_path = UPLOAD_DIR / f"{secrets.token_hex(8)}.part"
+
+    # the extension picks the extractor, so it is part of the key, as is
+    # the version of the code that produced the cached result
+    digest = hashlib.blake2b(f"{ANALYSIS_VERSION}:{ext}".encode(), digest_size=16)
+
+    try:
+        async with aiofiles.open(tmp_path, "wb") as buffer:
+            while chunk := await file.read(UPLOAD_CHUNK_SIZE):
+                digest.update(chunk)
+                await buffer.write(chunk)
+    except BaseException:
+        # aborted or failed upload: don't leave the partial file behind
+        tmp_path.unlink(missing_ok=True)
+        raise
+
+    file_id = digest.hexdigest()
+    path = UPLOAD_DIR / f"{file_id}.{ext}"
+    tmp_path.replace(path)
+
+    return path, file_id
+
+
+# ===============================
+# RESULT CACHE
+# ===============================
+
+@lru_cache(maxsize=256)
+def load_result(file_id):
+    # misses raise, and lru_cache doesn't cache exceptions
+    with open(CACHE_DIR / f"{file_id}.json", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def cached_result(file_id):
+
+    try:
+        result = load_result(file_id)
+    except (OSError, ValueError):
+        return None
+
+    try:
+        # atime doubles as last-used time for prune_cache; mtime is left
+        # alone so the report's ETag stays valid. a pruned report raises
+        # here and the result is recomputed
+        for path in (REPORT_DIR / f"{file_id}.pdf", CACHE_DIR / f"{file_id}.json"):
+            os.utime(path, ns=(time.time_ns(), path.stat().st_mtime_ns))
+    except FileNotFoundError:
+        return None
+
+    return result
+
+
+def store_result(file_id, result):
+
+    path = CACHE_DIR / f"{file_id}.json"
+    tmp_path = CACHE_DIR / f"{file_id}.{secrets.token_hex(8)}.tmp"
+
+    try:
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(result, f)
+
+        tmp_path.replace(path)
+    except BaseException:
+        tmp_path.unlink(missing_ok=True)
+        raise
+
+
+def prune_dir(directory, suffixes, keep):
+
+    entries = []
+
+    for f in directory.iterdir():
+        if f.suffix not in suffixes:
+            continue
+        try:
+            st = f.stat()
+            entries.append((max(st.st_atime, st.st_mtime), f))
+        except FileNotFoundError:
+            pass
+
+    entries.sort(reverse=True)
+
+    for _, f in entries[keep:]:
+        f.unlink(missing_ok=True)
+
+
+def prune_cache():
+
+    # keep the CACHE_MAX_ENTRIES most recently used of each kind;
+    # a result whose report or upload is gone is simply recomputed
+    prune_dir(CACHE_DIR, {".json"}, CACHE_MAX_ENTRIES)
+    prune_dir(REPORT_DIR, {".pdf"}, CACHE_MAX_ENTRIES)
+    prune_dir(UPLOAD_DIR, {f".{ext}" for ext in ALLOWED_EXTENSIONS}, CACHE_MAX_ENTRIES)
 
 
 # ===============================
 # TEXT EXTRACTION
 # ===============================
 
+# shared by all requests and created on first use; forkserver/spawn
+# workers start clean instead of forking a process that is running
+# spaCy and the event loop in other threads. PDFium only ever runs here.
+pdf_pool = None
+pdf_pool_lock = threading.Lock()
+
+
+def get_pdf_pool():
+
+    global pdf_pool
+
+    with pdf_pool_lock:
+        if pdf_pool is None:
+            if "forkserver" in multiprocessing.get_all_start_methods():
+                ctx = multiprocessing.get_context("forkserver")
+                ctx.set_forkserver_preload(["pdf_worker"])
+            else:
+                ctx = multiprocessing.get_context("spawn")
+
+            pdf_pool = ProcessPoolExecutor(max_workers=PDF_WORKERS, mp_context=ctx)
+
+    return pdf_pool
+
+
+def reset_pdf_pool(pool):
+
+    # a crashed worker leaves the pool broken for good and a hung one
+    # holds its slot; drop it so the next request gets a fresh pool
+    global pdf_pool
+
+    with pdf_pool_lock:
+        if pdf_pool is pool:
+            pdf_pool = None
+
+    for proc in list((getattr(pool, "_processes", None) or {}).values()):
+        proc.terminate()
+
+    pool.shutdown(wait=False, cancel_futures=True)
+
+
+def extract_pdf_text(path):
+
+    # every PDFium call happens in the pool: the library can't be
+    # used from two threads at once, even on different documents
+    pool = get_pdf_pool()
+
+    try:
+        n_pages, pages = pool.submit(
+            extract_short_pdf, path, max(PDF_FANOUT_MIN_PAGES, 1)
+        ).result(timeout=PDF_TIMEOUT)
+
+        if pages is None:
+            starts, stops = zip(*page_chunks(n_pages, PDF_WORKERS))
+
+            chunks = pool.map(
+                extract_pdf_pages,
+                [path] * len(starts),
+                starts,
+                stops,
+                timeout=PDF_TIMEOUT
+            )
+            pages = [t for chunk in chunks for t in chunk]
+
+    except (BrokenProcessPool, TimeoutError):
+        logger.exception("PDF extraction failed for %s, restarting the pool", path)
+        reset_pdf_pool(pool)
+        return ""
+
+    return "".join(t + "\n" for t in pages if t)
+
+
 def extract_text(path):
 
-    if path.endswith(".pdf"):
-        text = ""
-        with pdfplumber.open(path) as pdf:
-            for page in pdf.pages:
-                t = page.extract_text()
-                if t:
-                    text += t + "\n"
-        return text
+    if path.suffix == ".pdf":
+        return extract_pdf_text(path)
 
-    elif path.endswith(".docx"):
-        doc = docx.Document(path)
-        return "\n".join(p.text for p in doc.paragraphs)
+    elif path.suffix == ".docx":
+        return extract_docx_text(path)
 
-    elif path.endswith(".txt"):
+    elif path.suffix == ".txt":
         with open(path, "r", encoding="utf-8") as f:
             return f.read()
 
@@ -84,29 +306,74 @@ def extract_text(path):
 # LANGUAGE DETECTION
 # ===============================
 
+@lru_cache(maxsize=1)
+def language_model():
+
+    # loaded at startup by lifespan; without the model file languages
+    # are "unknown"
+    try:
+        return fasttext.load_model(LID_MODEL_PATH)
+    except ValueError:
+        logger.warning("language model %s not found, language detection disabled", LID_MODEL_PATH)
+        return None
+
+
 def detect_language(text):
+
+    model = language_model()
+
+    if model is None:
+        return "unknown"
+
+    # the first 2 KB is plenty for language ID; fastText wants one line.
+    # Calls the C++ binding directly: FastText.predict breaks on NumPy 2
+    line = text[:2000].replace("\n", " ") + "\n"
+
     try:
-        return detect(text)
-    except:
+        predictions = model.f.predict(line, 1, 0.0, "strict")
+    except ValueError:
+        return "unknown"
+
+    if not predictions:
         return "unknown"
 
+    return predictions[0][1].replace("__label__", "")
+
 
 # ===============================
 # CLAUSE EXTRACTION
 # ===============================
 
-def split_clauses(text):
+CLAUSE_RE = re.compile(r"\n\s*\d+[\.\)]\s+")
+
 
-    pattern = r"\n\s*\d+[\.\)]\s+"
-    parts = re.split(pattern, text)
+def clause_spans(text):
+
+    start = 0
+
+    for m in CLAUSE_RE.finditer(text):
+        yield start, m.start()
+        start = m.end()
+
+    yield start, len(text)
+
+
+def split_clauses(text):
 
     clauses = []
 
-    for i, part in enumerate(parts):
-        if len(part.strip()) > 50:
+    for i, (start, end) in enumerate(clause_spans(text)):
+
+        # too short even before stripping, don't slice it out
+        if end - start <= 50:
+            continue
+
+        part = text[start:end].strip()
+
+        if len(part) > 50:
             clauses.append({
                 "id": i+1,
-                "text": part.strip()
+                "text": part
             })
 
     return clauses
@@ -116,17 +383,62 @@ def split_clauses(text):
 # NAMED ENTITY RECOGNITION
 # ===============================
 
-def extract_entities(text):
+# clause digest -> entity tuples; boilerplate clauses repeat verbatim
+# across contracts, so most of them never reach the model twice. Keys
+# are fixed-size so NER_CACHE_SIZE bounds memory, not clause length
+ner_cache = OrderedDict()
+ner_cache_lock = threading.Lock()
+
+
+def clause_key(text):
+    return hashlib.blake2b(text.encode("utf-8", "surrogatepass"), digest_size=16).digest()
+
 
-    doc = nlp(text)
+def clause_entities(texts):
 
+    keys = [clause_key(t) for t in texts]
+
+    with ner_cache_lock:
+        known = {k: ner_cache[k] for k in keys if k in ner_cache}
+        for k in known:
+            ner_cache.move_to_end(k)
+
+    # only unseen texts go through the model, still batched
+    misses = [t for k, t in dict(zip(keys, texts)).items() if k not in known]
+    docs = nlp.pipe(misses, batch_size=SPACY_BATCH_SIZE, n_process=1)
+
+    for k in keys:
+        if k not in known:
+            ents = tuple((ent.text, ent.label_) for ent in next(docs).ents)
+            known[k] = ents
+
+            with ner_cache_lock:
+                ner_cache[k] = ents
+                if len(ner_cache) > NER_CACHE_SIZE:
+                    ner_cache.popitem(last=False)
+
+        yield known[k]
+
+
+def extract_entities(texts, limit=ENTITY_LIMIT):
+
+    seen = set()
     entities = []
 
-    for ent in doc.ents:
-        entities.append({
-            "text": ent.text,
-            "label": ent.label_
-        })
+    # stopping early also stops nlp.pipe from tagging remaining clauses
+    for ents in clause_entities(texts):
+        for key in ents:
+            if key in seen:
+                continue
+
+            seen.add(key)
+            entities.append({
+                "text": key[0],
+                "label": key[1]
+            })
+
+            if len(entities) >= limit:
+                return entities
 
     return entities
 
@@ -135,24 +447,33 @@ def extract_entities(text):
 # OBLIGATION / RIGHT / PROHIBITION
 # ===============================
 
-def detect_intent(sentence):
+INTENT_RE = re.compile(
+    r"\b(shall\s+not|must\s+not|may\s+not|cannot|shall|must|may|can)\b"
+)
 
-    s = sentence.lower()
+INTENTS = {
+    "shall not": "Prohibition",
+    "must not": "Prohibition",
+    "may not": "Prohibition",
+    "cannot": "Prohibition",
+    "shall": "Obligation",
+    "must": "Obligation",
+    "may": "Right",
+    "can": "Right"
+}
 
-    if "shall" in s or "must" in s:
-        return "Obligation"
 
-    if "may" in s or "can" in s:
-        return "Right"
+def detect_intent(s):
 
-    if "shall not" in s or "must not" in s:
-        return "Prohibition"
+    # expects lowercased text; negated forms come first in the
+    # alternation so "shall not" isn't read as "shall"
+    m = INTENT_RE.search(s)
 
-    return "Neutral"
+    return INTENTS[" ".join(m.group(1).split())] if m else "Neutral"
 
 
 # ===============================
-# RISK ENGINE
+# KEYWORD DICTIONARIES
 # ===============================
 
 HIGH_RISK = [
@@ -173,25 +494,58 @@ MEDIUM_RISK = [
     "confidentiality"
 ]
 
+RISK_WEIGHTS = {word: 30 for word in HIGH_RISK}
+RISK_WEIGHTS.update({word: 15 for word in MEDIUM_RISK})
+
+COMPLIANCE_RULES = {
+    "non compete": "Non-compete validity under Indian Contract Act",
+    "unlimited liability": "Unlimited liability may be unenforceable",
+    "no termination": "Termination restriction may violate labor laws"
+}
+
+KEYWORD_LIST = list(dict.fromkeys([*RISK_WEIGHTS, *COMPLIANCE_RULES]))
+
+# one matcher over every keyword, so each text is scanned once;
+# falls back to a compiled alternation when pyahocorasick is missing
+if ahocorasick:
+    KEYWORDS = ahocorasick.Automaton()
+
+    for word in KEYWORD_LIST:
+        KEYWORDS.add_word(word, word)
 
-def calculate_risk(text):
+    KEYWORDS.make_automaton()
 
-    score = 0
-    found = []
+    def iter_keywords(t):
+        return KEYWORDS.iter(t)
 
-    t = text.lower()
+else:
+    # zero-width lookahead so overlapping keywords ("block indemnify"
+    # holds both "lock in" and "indemnify") are all reported, like the
+    # automaton does
+    KEYWORDS = re.compile("(?=(" + "|".join(
+        map(re.escape, sorted(KEYWORD_LIST, key=len, reverse=True))
+    ) + "))")
+
+    def iter_keywords(t):
+        return (
+            (m.start() + len(m.group(1)) - 1, m.group(1))
+            for m in KEYWORDS.finditer(t)
+        )
+
+
+def find_keywords(t):
+    return {word for _, word in iter_keywords(t)}
+
+
+# ===============================
+# RISK ENGINE
+# ===============================
 
-    for word in HIGH_RISK:
-        if word in t:
-            score += 30
-            found.append(word)
+def score_keywords(hits):
 
-    for word in MEDIUM_RISK:
-        if word in t:
-            score += 15
-            found.append(word)
+    found = [word for word in RISK_WEIGHTS if word in hits]
 
-    score = min(score, 100)
+    score = min(sum(RISK_WEIGHTS[word] for word in found), 100)
 
     if score > 60:
         level = "HIGH"
@@ -203,40 +557,60 @@ def calculate_risk(text):
     return score, level, found
 
 
-# ===============================
-# COMPLIANCE CHECK (INDIA)
-# ===============================
+def calculate_risks(lowered):
+
+    # one matcher pass over all (lowercased) texts joined by a separator
+    # no keyword contains; hits are mapped back to their text by offset
+    starts = []
+    offset = 0
+    for t in lowered:
+        starts.append(offset)
+        offset += len(t) + 1
 
-def check_compliance(text):
+    hits = [set() for _ in lowered]
 
-    flags = []
+    for end, word in iter_keywords("\0".join(lowered)):
+        hits[bisect_right(starts, end) - 1].add(word)
 
-    t = text.lower()
+    return [score_keywords(h) for h in hits]
 
-    if "non compete" in t:
-        flags.append("Non-compete validity under Indian Contract Act")
 
-    if "unlimited liability" in t:
-        flags.append("Unlimited liability may be unenforceable")
+# ===============================
+# COMPLIANCE CHECK (INDIA)
+# ===============================
 
-    if "no termination" in t:
-        flags.append("Termination restriction may violate labor laws")
+def check_compliance(text_lower):
 
-    return flags
+    hits = find_keywords(text_lower)
+
+    return [msg for word, msg in COMPLIANCE_RULES.items() if word in hits]
 
 
 # ===============================
 # SIMPLE SUMMARY
 # ===============================
 
-def generate_summary(text):
+def generate_summary(text, max_sents=5, max_chars=500):
+
+    # the summary is the first max_sents "."-separated pieces joined by
+    # spaces, cut to max_chars; only the first max_chars + 1 characters
+    # can affect it, so that is all we scan or copy
+    end = len(text)
+    pos = sents = 0
 
-    lines = text.split(".")[:5]
+    while sents < max_sents:
+        i = text.find(".", pos, max_chars + 1)
+        if i < 0:
+            break
+        pos = i + 1
+        sents += 1
+        if sents == max_sents:
+            end = i
 
-    summary = " ".join(lines)
+    summary = text[:min(end, max_chars)].replace(".", " ")
 
-    if len(summary) > 500:
-        summary = summary[:500] + "..."
+    if end > max_chars:
+        summary += "..."
 
     return summary
 
@@ -245,55 +619,78 @@ def generate_summary(text):
 # PDF REPORT GENERATOR
 # ===============================
 
-def generate_report(data):
+NORMAL = getSampleStyleSheet()["Normal"]
+
+CLAUSE_TABLE_STYLE = TableStyle([
+    ("LEFTPADDING", (0, 0), (-1, -1), 0),
+    ("BOTTOMPADDING", (0, 0), (-1, -1), 15)
+])
 
-    report_id = str(uuid.uuid4())
-    path = f"{REPORT_DIR}/{report_id}.pdf"
 
-    doc = SimpleDocTemplate(path, pagesize=A4)
-    styles = getSampleStyleSheet()
+def generate_report(data, report_id):
+
+    path = REPORT_DIR / f"{report_id}.pdf"
+
+    doc = SimpleDocTemplate(str(path), pagesize=A4, invariant=True, pageCompression=1)
     elements = []
 
+    # flowables get canv/_frame set on them while drawing, so they can't be
+    # shared with a report being built on another thread
+    spacers = {h: Spacer(1, h) for h in (10, 15, 20)}
+
     def add(text, space=10):
-        elements.append(Paragraph(text, styles["Normal"]))
-        elements.append(Spacer(1, space))
+        elements.append(Paragraph(text, NORMAL))
+        elements.append(spacers[space])
+
+    def add_list(items):
+        elements.append(ListFlowable(
+            [Paragraph(i, NORMAL) for i in items],
+            bulletType="bullet",
+            start="-"
+        ))
+        elements.append(spacers[10])
 
 
     add("<b>Contract Analysis Report</b>", 20)
 
     add(f"Generated: {datetime.now()}")
 
-    add(f"Language: {data['language']}")
+    add(f"Language: {escape(data['language'])}")
 
     add(f"Risk Score: {data['risk_score']} ({data['risk_level']})", 20)
 
 
     add("<b>Summary</b>", 15)
-    add(data["summary"], 20)
+    add(escape(data["summary"]), 20)
 
 
     add("<b>Compliance Flags</b>", 15)
     if data["compliance"]:
-        for c in data["compliance"]:
-            add("- " + c)
+        add_list(escape(c) for c in data["compliance"])
     else:
         add("No major issues found")
 
 
     add("<b>Detected Entities</b>", 15)
-    for e in data["entities"][:20]:
-        add(f"{e['text']} ({e['label']})")
+    if data["entities"]:
+        add_list(
+            escape(f"{e['text']} ({e['label']})") for e in data["entities"][:20]
+        )
 
 
     add("<b>Clause Analysis</b>", 20)
 
-    for c in data["clauses"]:
-
-        add(f"<b>Clause {c['id']}</b>", 10)
-        add(c["text"][:500] + "...")
+    # contract text goes into Paragraph markup, so it must be escaped
+    rows = [[Paragraph(
+        f"<b>Clause {c['id']}</b><br/>"
+        f"{escape(c['text'][:500])}...<br/>"
+        f"Intent: {c['intent']}<br/>"
+        f"Risk: {c['risk_level']} ({c['risk_score']})",
+        NORMAL
+    )] for c in data["clauses"]]
 
-        add(f"Intent: {c['intent']}")
-        add(f"Risk: {c['risk_level']} ({c['risk_score']})", 15)
+    if rows:
+        elements.append(Table(rows, colWidths=[doc.width], style=CLAUSE_TABLE_STYLE))
 
 
     doc.build(elements)
@@ -301,35 +698,43 @@ def generate_report(data):
     return path
 
 
-# ===============================
-# MAIN PIPELINE
-# ===============================
+# report ids whose PDF is still being rendered in the background, and
+# ids whose rendering failed, so /download can tell both from a typo
+pending_reports = set()
+failed_reports = set()
 
-async def analyze_contract(file: UploadFile):
 
-    path = save_file(file)
+def build_report(data, report_id):
 
-    text = extract_text(path)
+    # the result is only cached once its report exists
+    try:
+        generate_report(data, report_id)
+        store_result(report_id, data)
+    except Exception:
+        logger.exception("report generation failed for %s", report_id)
+        failed_reports.add(report_id)
+        (REPORT_DIR / f"{report_id}.pdf").unlink(missing_ok=True)
+    else:
+        prune_cache()
+    finally:
+        pending_reports.discard(report_id)
 
-    if not text:
-        return {"error": "Could not extract text"}
 
-    language = detect_language(text)
+# ===============================
+# CLAUSE ANALYSIS
+# ===============================
 
-    clauses_raw = split_clauses(text)
+def process_clauses(clauses_raw):
 
     clauses = []
 
-    total_risk = 0
+    lowered = [c["text"].lower() for c in clauses_raw]
 
+    risks = calculate_risks(lowered)
 
-    for c in clauses_raw:
+    for c, tl, (score, level, found) in zip(clauses_raw, lowered, risks):
 
-        intent = detect_intent(c["text"])
-
-        score, level, found = calculate_risk(c["text"])
-
-        total_risk += score
+        intent = detect_intent(tl)
 
         clauses.append({
             "id": c["id"],
@@ -340,6 +745,50 @@ async def analyze_contract(file: UploadFile):
             "keywords": found
         })
 
+    return clauses
+
+
+# ===============================
+# MAIN PIPELINE
+# ===============================
+
+# bounds concurrent document parses per process
+parse_limiter = asyncio.Semaphore(PARSE_CONCURRENCY)
+
+
+async def analyze_contract(file: UploadFile, background_tasks: BackgroundTasks):
+
+    ext = file_extension(file)
+
+    if ext not in ALLOWED_EXTENSIONS:
+        return {"error": "Unsupported file type"}
+
+    path, file_id = await save_file(file, ext)
+
+    cached = cached_result(file_id)
+
+    if cached:
+        return cached
+
+    async with parse_limiter:
+        text = await asyncio.to_thread(extract_text, path)
+
+    if not text:
+        return {"error": "Could not extract text"}
+
+    clauses_raw = split_clauses(text)
+
+    clause_texts = [c["text"] for c in clauses_raw] or [text]
+
+    language, entities, compliance, summary, clauses = await asyncio.gather(
+        asyncio.to_thread(detect_language, text),
+        asyncio.to_thread(extract_entities, clause_texts, ENTITY_LIMIT),
+        asyncio.to_thread(check_compliance, text.lower()),
+        asyncio.to_thread(generate_summary, text),
+        asyncio.to_thread(process_clauses, clauses_raw)
+    )
+
+    total_risk = sum(c["risk_score"] for c in clauses)
 
     avg_risk = int(total_risk / max(len(clauses),1))
 
@@ -351,13 +800,6 @@ async def analyze_contract(file: UploadFile):
         contract_level = "LOW"
 
 
-    entities = extract_entities(text)
-
-    compliance = check_compliance(text)
-
-    summary = generate_summary(text)
-
-
     result = {
         "language": language,
         "risk_score": avg_risk,
@@ -369,9 +811,14 @@ async def analyze_contract(file: UploadFile):
     }
 
 
-    report_path = generate_report(result)
+    result["report_url"] = f"/download/{file_id}.pdf"
 
-    result["report_url"] = f"/download/{os.path.basename(report_path)}"
+    # render the PDF after the response is sent; /download answers 202
+    # until it is ready
+    if file_id not in pending_reports:
+        failed_reports.discard(file_id)
+        pending_reports.add(file_id)
+        background_tasks.add_task(build_report, result, file_id)
 
     return result
 
@@ -381,19 +828,68 @@ async def analyze_contract(file: UploadFile):
 # ===============================
 
 @app.post("/analyze")
-async def analyze(file: UploadFile = File(...)):
+async def analyze(background_tasks: BackgroundTasks, file: UploadFile = File(...)):
 
-    result = await analyze_contract(file)
+    result = await analyze_contract(file, background_tasks)
 
     return result
 
 
+def not_modified(request, etag, mtime):
+
+    # If-None-Match wins over If-Modified-Since when both are sent
+    if_none_match = request.headers.get("if-none-match")
+
+    if if_none_match is not None:
+        tags = [t.strip().removeprefix("W/") for t in if_none_match.split(",")]
+        return "*" in tags or etag in tags
+
+    if_modified_since = request.headers.get("if-modified-since")
+
+    if if_modified_since is None:
+        return False
+
+    try:
+        return int(mtime) <= parsedate_to_datetime(if_modified_since).timestamp()
+    except (TypeError, ValueError):
+        return False
+
+
 @app.get("/download/{filename}")
-def download(filename: str):
+def download(filename: str, request: Request):
+
+    name = Path(filename).name
+
+    if Path(name).stem in pending_reports:
+        return Response(status_code=202, headers={"Retry-After": "1"})
 
-    path = f"{REPORT_DIR}/{filename}"
+    if Path(name).stem in failed_reports:
+        raise HTTPException(status_code=500, detail="Report generation failed")
+
+    path = (REPORT_DIR / name).resolve()
+
+    if path.parent != REPORT_DIR.resolve() or path.suffix != ".pdf" or not path.is_file():
+        raise HTTPException(status_code=404, detail="Report not found")
+
+    stat_result = path.stat()
+
+    response = FileResponse(
+        path,
+        media_type="application/pdf",
+        filename=name,
+        stat_result=stat_result,
+        headers={"Cache-Control": "public, max-age=3600"}
+    )
+
+    # Starlette sets ETag / Last-Modified but never answers 304 itself
+    if not_modified(request, response.headers["etag"], stat_result.st_mtime):
+        return Response(status_code=304, headers={
+            "ETag": response.headers["etag"],
+            "Last-Modified": response.headers["last-modified"],
+            "Cache-Control": "public, max-age=3600"
+        })
 
-    return FileResponse(path, media_type="application/pdf")
+    return response
 
 
 # ===============================
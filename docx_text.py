@@ -0,0 +1,66 @@
+# docx_text.py
+#
+# DOCX text extraction for contract_ai_app. Reads word/document.xml
+# straight from the zip with a streaming, hardened parser.
+
+import zipfile
+
+from lxml import etree
+
+
+W = "{http://schemas.openxmlformats.org/wordprocessingml/2006/main}"
+MC = "{http://schemas.openxmlformats.org/markup-compatibility/2006}"
+
+# run children that carry text, as python-docx renders them
+RUN_TEXT = {
+    W + "tab": "\t",
+    W + "ptab": "\t",
+    W + "br": "\n",
+    W + "cr": "\n",
+    W + "noBreakHyphen": "-"
+}
+
+
+def extract_docx_text(path):
+
+    paragraphs = []
+
+    try:
+        with zipfile.ZipFile(path) as z, z.open("word/document.xml") as f:
+            # untrusted upload: never expand entities or fetch DTDs
+            events = etree.iterparse(
+                f,
+                events=("end",),
+                tag=W + "p",
+                resolve_entities=False,
+                no_network=True,
+                load_dtd=False,
+                huge_tree=False
+            )
+
+            for _, p in events:
+                # text boxes are written twice, as mc:Choice and as a VML
+                # mc:Fallback copy; read the Choice only
+                if next(p.iterancestors(MC + "Fallback"), None) is not None:
+                    p.clear()
+                    continue
+
+                parts = []
+
+                for run in p.iter(W + "r"):
+                    for el in run:
+                        if el.tag == W + "t":
+                            parts.append(el.text or "")
+                        elif el.tag in RUN_TEXT:
+                            parts.append(RUN_TEXT[el.tag])
+
+                paragraphs.append("".join(parts))
+
+                # keeps memory flat; also stops an enclosing paragraph
+                # (text boxes) from repeating this one's text
+                p.clear()
+
+    except (zipfile.BadZipFile, KeyError, etree.XMLSyntaxError):
+        return ""
+
+    return "\n".join(paragraphs)
@@ -0,0 +1,59 @@
+# pdf_worker.py
+#
+# PDF text extraction run inside the worker processes of
+# contract_ai_app's PDF pool. Kept apart from the app module so that
+# spawned workers don't re-import spaCy and the fastText model.
+
+import pypdfium2 as pdfium
+
+
+def page_chunks(n_pages, workers):
+
+    # contiguous (start, stop) ranges, one per worker at most; the last
+    # range is clamped, PDFium raises on pages past the end
+    step = -(-n_pages // max(workers, 1))
+
+    return [(s, min(s + step, n_pages)) for s in range(0, n_pages, step or 1)]
+
+
+def page_texts(pdf, start, stop):
+
+    stop = min(stop, len(pdf))
+
+    return [
+        pdf[i].get_textpage().get_text_range().replace("\r\n", "\n")
+        for i in range(start, stop)
+    ]
+
+
+def extract_pdf_pages(path, start, stop):
+
+    # each worker opens its own document; PDFium isn't thread-safe and
+    # its handles can't be shared across processes
+    pdf = pdfium.PdfDocument(path)
+
+    try:
+        return page_texts(pdf, start, stop)
+    finally:
+        pdf.close()
+
+
+def extract_short_pdf(path, max_pages):
+
+    # one round trip for the common case: returns (n_pages, texts), with
+    # texts None when the document is long enough to split up instead;
+    # unreadable files come back as no pages
+    try:
+        pdf = pdfium.PdfDocument(path)
+    except pdfium.PdfiumError:
+        return 0, []
+
+    try:
+        n_pages = len(pdf)
+
+        if n_pages >= max_pages:
+            return n_pages, None
+
+        return n_pages, page_texts(pdf, 0, n_pages)
+    finally:
+        pdf.close()
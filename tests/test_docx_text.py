@@ -0,0 +1,78 @@
+import zipfile
+
+import pytest
+
+pytest.importorskip("lxml")
+
+from docx_text import extract_docx_text
+
+
+DOCUMENT = """<?xml version="1.0" encoding="UTF-8" standalone="yes"?>
+<w:document
+    xmlns:w="http://schemas.openxmlformats.org/wordprocessingml/2006/main"
+    xmlns:mc="http://schemas.openxmlformats.org/markup-compatibility/2006"
+    xmlns:wp="http://schemas.openxmlformats.org/drawingml/2006/wordprocessingDrawing"
+    xmlns:a="http://schemas.openxmlformats.org/drawingml/2006/main"
+    xmlns:wps="http://schemas.microsoft.com/office/word/2010/wordprocessingShape"
+    xmlns:v="urn:schemas-microsoft-com:vml"
+    mc:Ignorable="wps">
+  <w:body>
+    <w:p><w:r><w:t>Before the box.</w:t></w:r></w:p>
+    <w:p>
+      <w:r>
+        <mc:AlternateContent>
+          <mc:Choice Requires="wps">
+            <w:drawing><wp:anchor><a:graphic><a:graphicData><wps:wsp><wps:txbx>
+              <w:txbxContent>
+                <w:p><w:r><w:t>Inside</w:t><w:tab/><w:t>the box.</w:t></w:r></w:p>
+              </w:txbxContent>
+            </wps:txbx></wps:wsp></a:graphicData></a:graphic></wp:anchor></w:drawing>
+          </mc:Choice>
+          <mc:Fallback>
+            <w:pict><v:shape><v:textbox>
+              <w:txbxContent>
+                <w:p><w:r><w:t>Inside</w:t><w:tab/><w:t>the box.</w:t></w:r></w:p>
+              </w:txbxContent>
+            </v:textbox></v:shape></w:pict>
+          </mc:Fallback>
+        </mc:AlternateContent>
+      </w:r>
+      <w:r><w:t>Next to the box.</w:t></w:r>
+    </w:p>
+  </w:body>
+</w:document>
+"""
+
+
+def make_docx(path, document):
+    with zipfile.ZipFile(path, "w") as z:
+        z.writestr("word/document.xml", document)
+    return path
+
+
+def test_text_box_is_read_once(tmp_path):
+    path = make_docx(tmp_path / "textbox.docx", DOCUMENT)
+
+    assert extract_docx_text(path).split("\n") == [
+        "Before the box.",
+        "Inside\tthe box.",
+        "Next to the box."
+    ]
+
+
+def test_entities_are_not_expanded(tmp_path):
+    document = DOCUMENT.replace(
+        "<w:document",
+        '<!DOCTYPE w:document [<!ENTITY x "expanded">]>\n<w:document',
+        1
+    ).replace("Before the box.", "&x;")
+    path = make_docx(tmp_path / "entity.docx", document)
+
+    assert "expanded" not in extract_docx_text(path)
+
+
+def test_not_a_docx(tmp_path):
+    path = tmp_path / "plain.docx"
+    path.write_text("not a zip")
+
+    assert extract_docx_text(path) == ""
@@ -0,0 +1,55 @@
+import pytest
+
+pytest.importorskip("pypdfium2")
+canvas = pytest.importorskip("reportlab.pdfgen.canvas")
+
+from pdf_worker import extract_pdf_pages, extract_short_pdf, page_chunks
+
+
+def make_pdf(path, n_pages):
+    c = canvas.Canvas(str(path))
+    for i in range(n_pages):
+        c.drawString(72, 720, f"page {i}")
+        c.showPage()
+    c.save()
+    return path
+
+
+@pytest.mark.parametrize("n_pages", [8, 9, 11, 13, 20, 23])
+def test_page_chunks_cover_every_page_once(n_pages):
+    chunks = page_chunks(n_pages, 8)
+
+    assert len(chunks) <= 8
+    assert [i for start, stop in chunks for i in range(start, stop)] == list(range(n_pages))
+
+
+def test_chunked_extraction_when_pages_dont_divide_evenly(tmp_path):
+    # 9 pages over 8 workers: step 2, so a naive last chunk asks for page 9
+    path = make_pdf(tmp_path / "nine.pdf", 9)
+
+    pages = [t for start, stop in page_chunks(9, 8) for t in extract_pdf_pages(path, start, stop)]
+
+    assert [t.strip() for t in pages] == [f"page {i}" for i in range(9)]
+
+
+def test_extract_pdf_pages_clamps_past_the_end(tmp_path):
+    path = make_pdf(tmp_path / "three.pdf", 3)
+
+    assert len(extract_pdf_pages(path, 2, 4)) == 1
+
+
+def test_extract_short_pdf(tmp_path):
+    path = make_pdf(tmp_path / "two.pdf", 2)
+
+    n_pages, pages = extract_short_pdf(path, 8)
+    assert n_pages == 2
+    assert [t.strip() for t in pages] == ["page 0", "page 1"]
+
+    assert extract_short_pdf(path, 2) == (2, None)
+
+
+def test_extract_short_pdf_unreadable(tmp_path):
+    path = tmp_path / "bad.pdf"
+    path.write_bytes(b"not a pdf")
+
+    assert extract_short_pdf(path, 8) == (0, [])